@@ -1,77 +1,236 @@
 from openai import OpenAI
-import os, subprocess, json, requests
+import os, re, sys, json, hashlib, random, time
+import httpx
 
-# Create OpenAI client with your secret key from GitHub Actions Secrets
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+# orjson parses the structured reply natively; fall back to the stdlib.
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+MODEL = "gpt-4o"
+
+# Create OpenAI client with your secret key from GitHub Actions Secrets.
+# Bounded timeouts: a stalled connection fails in seconds instead of the SDK's
+# 10-minute default holding the job; the SDK's own retries stay on.
+client = OpenAI(
+    api_key=os.environ.get("OPENAI_API_KEY"),
+    timeout=httpx.Timeout(120.0, connect=5.0)
+)
 
 # Environment variables set by the workflow
 repo = os.environ["REPO"]
 pr_number = os.environ["PR_NUMBER"]
-base_ref = os.environ["BASE_REF"]
 gh_token = os.environ["GITHUB_TOKEN"]
 
-# Step 1: Make sure we have the latest base branch
-subprocess.run(["git", "fetch", "origin", base_ref], check=False)
+GITHUB_HEADERS = {
+    "Authorization": f"Bearer {gh_token}",
+    "Accept": "application/vnd.github+json"
+}
+# Rate limits and transient server errors are retried; every other 4xx fails fast.
+RETRY_STATUSES = {429, 502, 503, 504}
+MAX_BACKOFF = 30.0
+
+def should_retry(response):
+    """True for a transient failure; GitHub also reports rate limits as a 403 with these headers."""
+    if response.status_code in RETRY_STATUSES:
+        return True
+    return response.status_code == 403 and (
+        "retry-after" in response.headers
+        or response.headers.get("x-ratelimit-remaining") == "0"
+    )
+
+def backoff_delay(attempt, response=None):
+    """Seconds to wait before retrying: the server's Retry-After if given, else jittered exponential; capped."""
+    retry_after = response.headers.get("retry-after", "") if response is not None else ""
+    if retry_after.isdigit():
+        return min(MAX_BACKOFF, float(retry_after))
+    return min(MAX_BACKOFF, 0.3 * 2 ** attempt) * (1 + 0.5 * random.random())
+
+# Strict structured output: the API enforces this shape, so the reply always parses.
+REVIEW_SCHEMA = {
+    "type": "json_schema",
+    "name": "review",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["suggestions"],
+        "properties": {
+            "suggestions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": ["filename", "line", "comment"],
+                    "properties": {
+                        "filename": {"type": "string"},
+                        "line": {"type": "integer"},
+                        "comment": {"type": "string"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+# Prompt budget: only hunks that add code are sent, capped at this many characters.
+MAX_DIFF_CHARS = 60_000
+MAX_OUTPUT_TOKENS = 2048
+# New-file side of a hunk header: "@@ -a,b +start,count @@".
+HUNK_RIGHT_RE = re.compile(rb"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+def filter_hunks(raw, max_chars=MAX_DIFF_CHARS):
+    """Reduce a raw (bytes) diff to hunks changing more than trailing whitespace; decode only those.
+
+    Returns the diff text and, per file, the RIGHT-side line ranges of the hunks it contains.
+    """
+    files = []  # [(path, [hunk_bytes, ...])]
+    path = None
+    hunk = None
 
-# Step 2: Get the diff for the PR compared to the base branch
-diff = subprocess.check_output(
-    ["git", "diff", f"origin/{base_ref}", "--unified=0"]
-).decode(errors="ignore")
+    def flush():
+        if hunk is None or path is None:
+            return
+        # rstrip only: leading whitespace is indentation, which changes Python semantics.
+        added = [row[1:].rstrip() for row in hunk[1:] if row.startswith(b"+")]
+        removed = [row[1:].rstrip() for row in hunk[1:] if row.startswith(b"-")]
+        if any(added) and added != removed:
+            if not files or files[-1][0] != path:
+                files.append((path, []))
+            files[-1][1].append(b"\n".join(hunk))
 
-# Step 3: Ask the AI for review suggestions in JSON format
+    for line in raw.splitlines():
+        if line.startswith(b"diff --git"):
+            flush()
+            hunk, path = None, None
+        elif line.startswith(b"@@"):
+            flush()
+            hunk = [line]
+        elif hunk is not None:
+            hunk.append(line)
+        elif line.startswith(b"+++ "):
+            target = line[4:].rstrip(b"\t")
+            path = None if target == b"/dev/null" else target.removeprefix(b"b/")
+    flush()
+
+    out, total = [], 0
+    commentable = {}  # {path: [range, ...]}
+    for file_path, hunks in files:
+        header_sent = False
+        for chunk in hunks:
+            # The file header goes out only together with its first kept hunk, never alone.
+            pieces = [chunk] if header_sent else [b"+++ b/" + file_path, chunk]
+            size = sum(len(piece) + 1 for piece in pieces)
+            if total + size > max_chars:
+                continue  # skip just this hunk: smaller ones further on may still fit
+            header_sent = True
+            out.extend(piece.decode("utf-8", errors="replace") for piece in pieces)
+            total += size
+            m = HUNK_RIGHT_RE.match(chunk)
+            if m:
+                start, count = int(m.group(1)), int(m.group(2) or 1)
+                name = file_path.decode("utf-8", errors="replace")
+                commentable.setdefault(name, []).append(range(start, start + count))
+    return "\n".join(out), commentable
+
+# One keep-alive client for every GitHub call; the transport retries failed connects.
+http = httpx.Client(
+    headers=GITHUB_HEADERS,
+    transport=httpx.HTTPTransport(retries=3),
+    follow_redirects=True,
+    timeout=30
+)
+
+# Step 1: Get the PR diff straight from the GitHub API (no git fetch/diff needed)
+diff_resp = http.get(
+    f"https://api.github.com/repos/{repo}/pulls/{pr_number}",
+    headers={"Accept": "application/vnd.github.v3.diff"}
+)
+diff_resp.raise_for_status()
+diff, commentable = filter_hunks(diff_resp.content)
+if not diff:
+    print("No reviewable changes in the diff")
+    sys.exit(0)
+
+# Reviews are cached on disk by (model, diff) so re-runs on an unchanged PR
+# don't spend tokens again. Trailing whitespace is dropped from the key: it moves
+# no lines, so a push that only touches it reuses the stored review.
+cache = diskcache.Cache(os.environ.get("REVU_CACHE_DIR", ".revu_cache")) if diskcache else None
+normalized_diff = "\n".join(line.rstrip() for line in diff.splitlines())
+cache_key = hashlib.blake2b(f"{MODEL}\n{normalized_diff}".encode("utf-8", errors="ignore"),
+                            digest_size=16).hexdigest()
+
+# Step 2: Ask the AI for review suggestions in JSON format
 prompt = f"""
 You are a strict, helpful code reviewer.
-Review the following diff and produce a JSON object with an array 'suggestions'.
+Review the following diff and list your suggestions.
 Each suggestion must have:
 - "filename": file path
 - "line": line number in the new file (RIGHT side of diff)
 - "comment": a concise suggestion with rationale
 
-Return ONLY valid JSON. Do not include markdown formatting or explanations outside of JSON.
-
 Diff:
 {diff}
 """
 
-resp = client.responses.create(
-    model="gpt-4o",
-    input=[
-        {"role": "system", "content": "You are a precise code review assistant."},
-        {"role": "user", "content": prompt}
-    ],
-    response_format={"type": "json_object"}
-)
+data = cache.get(cache_key) if cache is not None else None
+if data is None:
+    resp = client.responses.create(
+        model=MODEL,
+        input=[
+            {"role": "system", "content": "You are a precise code review assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        text={"format": REVIEW_SCHEMA},
+        max_output_tokens=MAX_OUTPUT_TOKENS
+    )
 
-try:
-    content = resp.output_text.strip()
-    data = json.loads(content)
-except Exception as e:
-    print("Error parsing AI response:", e)
-    data = {"suggestions": []}
-
-# Step 4: Function to post review comments to the PR
-def post_comment(suggestion):
-    url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}/comments"
-    payload = {
-        "body": suggestion["comment"],
-        "path": suggestion["filename"],
-        "line": int(suggestion["line"]),
-        "side": "RIGHT"
+    if resp.status == "completed":
+        data = json_loads(resp.output_text)
+        if cache is not None:
+            cache.set(cache_key, data)
+    else:
+        print("AI response incomplete:", resp.status)
+        data = {"suggestions": []}
+
+# Step 3: Post all suggestions as a single PR review (one request, one rate-limit charge).
+# GitHub rejects the whole review with a 422 if any comment is outside the diff, so
+# drop suggestions whose line is not in a hunk the model was shown.
+def in_diff(s):
+    return any(int(s["line"]) in lines for lines in commentable.get(s["filename"], ()))
+
+suggestions = [s for s in data.get("suggestions", []) if in_diff(s)]
+dropped = len(data.get("suggestions", [])) - len(suggestions)
+if dropped:
+    print(f"Dropped {dropped} suggestion(s) on lines outside the diff")
+if suggestions:
+    review = {
+        "event": "COMMENT",
+        "comments": [
+            {"path": s["filename"], "line": int(s["line"]), "side": "RIGHT", "body": s["comment"]}
+            for s in suggestions
+        ]
     }
-    r = requests.post(
-        url,
-        headers={
-            "Authorization": f"Bearer {gh_token}",
-            "Accept": "application/vnd.github+json"
-        },
-        json=payload
-    )
-    if r.status_code >= 300:
-        print(f"Failed to comment ({r.status_code}): {r.text}")
-
-# Step 5: Loop through suggestions and post them
-for s in data.get("suggestions", []):
-    try:
-        post_comment(s)
-    except Exception as e:
-        print("Error posting comment:", e)
+    url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}/reviews"
+    r = None
+    for attempt in range(3):
+        try:
+            r = http.post(url, json=review)
+        except httpx.TransportError as e:  # timeouts, dropped connections
+            print(f"Review POST failed: {e!r}")
+            r = None
+        else:
+            if not should_retry(r):
+                break
+        if attempt < 2:
+            time.sleep(backoff_delay(attempt, r))
+    if r is None:
+        print("Failed to post review: no response from GitHub")
+    elif r.status_code >= 300:
+        print(f"Failed to post review ({r.status_code}): {r.text}")
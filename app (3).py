@@ -1,22 +1,52 @@
 python
 import os
+import atexit
 import io
 import re
 import csv
 import json
 import ast
-import difflib
+import hashlib
 import tokenize
+import shutil
 import subprocess
 import tempfile
-from typing import List, Dict, Optional, Tuple
-
+import time
+import uuid
+import functools
+import importlib
+import itertools
+import concurrent.futures
+from collections import Counter
+from types import ModuleType
+from typing import (Any, Callable, List, Dict, Container, Iterable, Mapping, Optional, Sequence,
+                    Tuple, Union)
+
+import pyarrow as pa
 import streamlit as st
-from PIL import Image
+from streamlit.runtime.uploaded_file_manager import UploadedFile
+
+from revu_findings import FINDING_HEADERS, Finding
+
+# orjson decodes the tools' JSON reports straight from bytes, several times faster
+# than the stdlib; fall back to json when it is not installed.
+_json_loads: Callable[[Union[str, bytes]], Any]
+try:
+    from orjson import loads as _json_loads
+except Exception:
+    _json_loads = json.loads
+# Optional persistent cache for tool results across sessions and restarts.
+try:
+    import diskcache
+except Exception:
+    diskcache = None
 
 # ==================== Page setup & hero ====================
 st.set_page_config(page_title="RevU — Your Code Reviewer (Pro)", page_icon="🤖", layout="wide")
 
+# Only the path lookup is cached: st.image serves a file path as-is, whereas a PIL
+# image would be re-encoded to PNG on every rerun.
+@st.cache_resource(show_spinner=False)
 def load_robot_image() -> Optional[str]:
     """Find a bundled robot.png (repo root or ./assets or /mnt/data) and return its path, else None."""
     candidates = [
@@ -34,17 +64,14 @@ with st.container():
     with left:
         img_path = load_robot_image()
         if img_path:
-            try:
-                st.image(Image.open(img_path), use_column_width=True)
-            except Exception:
-                st.image(img_path, use_column_width=True)
+            st.image(img_path, use_column_width=True)
         else:
             st.write("🤖")
     with mid:
         st.markdown("# RevU — Enhanced Python Code Reviewer")
         st.caption(
-            "Detects syntax (AST/tokenize/parso), lint/style (Ruff), formatting (Black), "
-            "imports (isort), typing (mypy), security (Bandit), docstrings (pydocstyle), "
+            "Detects syntax (AST/tokenize/parso), lint/style (Ruff), formatting (Ruff format), "
+            "imports (Ruff), typing (mypy), security (Ruff/Bandit), docstrings (pydocstyle), "
             "code smells (Pylint), complexity (Radon), dead code (Vulture), and optional runtime errors."
         )
 
@@ -67,69 +94,194 @@ with st.sidebar:
         value=False,
         help="Runs with -W error so Python warnings become runtime failures."
     )
+    run_legacy_tools = st.toggle(
+        "Also run legacy tools (Bandit, pydocstyle, Pylint)",
+        value=False,
+        help="Ruff already covers Bandit's checks (S), docstrings (D) and Pylint rules (PL).",
+    )
+    always_heavy_tools = st.toggle(
+        "Always run heavy tools (Pylint, Radon, Vulture)",
+        value=False,
+        help="By default these are skipped for snippets shorter than 50 lines.",
+    )
     st.markdown(
-        "<p style='color:#6b6f76'>Tools: AST, tokenize, parso*, Ruff, Black, isort, mypy, Bandit, pydocstyle, "
+        "<p style='color:#6b6f76'>Tools: AST, parso (tokenize fallback), Ruff, Ruff format, mypy, Bandit, pydocstyle, "
         "Pylint, Radon, Vulture, optional Runtime</p>",
         unsafe_allow_html=True,
     )
 
 # ==================== UI ====================
+@st.cache_data(show_spinner=False, max_entries=8)
+def _decode_upload(file_id: str, _upload: UploadedFile) -> str:
+    # Keyed on the upload's id only: reruns reuse the decoded text without
+    # re-reading or re-hashing the file. Decoding from the buffer view skips the
+    # bytes copy getvalue() would make, so peak memory is the upload plus its text.
+    with _upload.getbuffer() as view:
+        return str(view, "utf-8", errors="ignore")
+
 code = st.text_area("Paste your Python code here", height=260, placeholder="# Paste code or upload a file…")
 uploaded = st.file_uploader("…or upload a code file", type=None)
 if uploaded and not code:
     try:
-        code = uploaded.read().decode("utf-8", errors="ignore")
+        code = _decode_upload(uploaded.file_id, uploaded)
     except Exception:
         code = ""
 run_clicked = st.button("🔎 Review Code", use_container_width=True)
 
 # ==================== Helpers ====================
-def _tmp_py(code_text: str) -> str:
-    f = tempfile.NamedTemporaryFile(delete=False, suffix=".py", mode="w", encoding="utf-8")
-    f.write(code_text)
-    f.flush()
-    f.close()
-    return f.name
-
-def _run(cmd: List[str], cwd: Optional[str] = None, timeout: int = 30) -> Tuple[int, str, str]:
+# Scratch files live on tmpfs when available: no journaling or disk sync on the hot path.
+_TMP_ROOT: Optional[str] = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+
+# Streamlit has no session-end hook: session directories idle this long are dropped
+# when a new session starts (a returning session simply recreates its own).
+_SCRATCH_IDLE_SECONDS = 3600
+
+@st.cache_resource(show_spinner=False)
+def _scratch_root() -> str:
+    """One scratch directory per process, holding a subdirectory per session; removed at exit."""
+    path = tempfile.mkdtemp(prefix="revu-", dir=_TMP_ROOT)
+    atexit.register(shutil.rmtree, path, True)
+    return path
+
+def _prune_scratch(root: str) -> None:
+    cutoff = time.time() - _SCRATCH_IDLE_SECONDS
+    with os.scandir(root) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass
+
+def _session_dir() -> str:
+    """Scratch directory reused by every review in this browser session."""
+    root = _scratch_root()
+    name = st.session_state.get("scratch_id")
+    if name is None:
+        name = st.session_state["scratch_id"] = uuid.uuid4().hex
+        _prune_scratch(root)
+    path = os.path.join(root, name)
+    os.makedirs(path, exist_ok=True)
+    os.utime(path)  # marks the session active for _prune_scratch
+    return path
+
+def _write(path: str, code_text: str) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(code_text)
+    return path
+
+@st.cache_resource(show_spinner=False)
+def _which(binary: str) -> Optional[str]:
+    """Resolve a binary on PATH once per process; None when it is not installed."""
+    return shutil.which(binary)
+
+def _has(binary: str) -> bool:
+    return _which(binary) is not None
+
+# Bandit, parso and ruff_api are only needed once a review runs (Bandit alone takes
+# ~100 ms to import), so they are imported on first use rather than at page load.
+@st.cache_resource(show_spinner=False)
+def _optional_import(name: str) -> Optional[ModuleType]:
+    """Import an optional module once per process; None when it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except Exception:
+        return None
+
+def _run(cmd: List[str], cwd: Optional[str] = None, timeout: int = 30,
+         stdin: Optional[str] = None, stderr: bool = True) -> Tuple[int, bytes, bytes]:
+    # Output stays as bytes: both JSON decoders accept UTF-8 bytes directly, and text
+    # parsers decode only what they need. Buffering is deliberate: communicate()
+    # drains stdout and stderr together, so a child never stalls on a full pipe,
+    # reports for one snippet are a few KB, and dmypy answers only when done.
+    # The executable is the cached absolute path: no PATH walk per spawn, and a
+    # missing tool is never fork/exec'd. Callers that only parse stdout pass
+    # stderr=False: it goes to /dev/null instead of a pipe and buffer.
+    exe = _which(cmd[0])
+    if exe is None:
+        return 127, b"", f"{cmd[0]}: not installed".encode()
     try:
-        p = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, timeout=timeout)
-        return p.returncode, p.stdout, p.stderr
+        p = subprocess.run([exe, *cmd[1:]], cwd=cwd, stdout=subprocess.PIPE,
+                           stderr=subprocess.PIPE if stderr else subprocess.DEVNULL, timeout=timeout,
+                           input=stdin.encode("utf-8") if stdin is not None else None)
+        return p.returncode, p.stdout, p.stderr or b""
     except FileNotFoundError:
-        return 127, "", f"{cmd[0]}: not installed"
+        return 127, b"", f"{cmd[0]}: not installed".encode()
     except subprocess.TimeoutExpired:
-        return 124, "", "timeout"
-
-def _to_csv(rows: List[Dict], headers: List[str]) -> bytes:
-    buf = io.StringIO()
-    writer = csv.DictWriter(buf, fieldnames=headers)
-    writer.writeheader()
-    for r in rows:
-        writer.writerow({k: r.get(k, "") for k in headers})
-    return buf.getvalue().encode("utf-8")
+        return 124, b"", b"timeout"
+
+# _run's own exit codes for a tool that produced no report at all.
+_RUN_FAILURES = {124: "timed out", 127: "not installed"}
+# Exit codes with which each CLI completes a report; anything else is a crash or a
+# usage error. Pylint's status is a bit mask of message categories (32: usage error).
+_TOOL_EXIT_CODES: Dict[str, Container[int]] = {
+    "Ruff": {0, 1},
+    "Ruff format": {0, 1, 2},  # 2: the input could not be parsed
+    "mypy": {0, 1, 2},         # 2: blocking errors, see run_mypy
+    "Bandit": {0, 1},
+    "pydocstyle": {0, 1},
+    "Pylint": range(32),
+    "Radon": {0},
+    "Vulture": {0, 1, 3},      # 1: the input could not be parsed; 3: dead code found
+}
+
+def _check_rc(tool: str, rc: int) -> None:
+    # Raise rather than parse empty output as "no findings": st.cache_data does not
+    # keep exceptions, and analyze() reports the failure without caching it.
+    if rc not in _TOOL_EXIT_CODES[tool]:
+        raise RuntimeError(_RUN_FAILURES.get(rc, f"exited with status {rc}"))
+
+# None of the headers need quoting, so the CSV header line is a fixed prefix.
+_CSV_HEADER_BYTES = (",".join(FINDING_HEADERS) + "\r\n").encode("utf-8")
+
+def _columns(rows: Iterable[Finding]) -> Dict[str, Tuple[Any, ...]]:
+    """Transpose findings into one tuple per header, the layout tables and CSV consume."""
+    cols = list(zip(*rows))
+    return dict(zip(FINDING_HEADERS, cols or [()] * len(FINDING_HEADERS)))
+
+def _to_arrow(columns: Mapping[str, Sequence[Any]]) -> pa.Table:
+    """Columns as an Arrow table, which st.dataframe sends without a pandas round-trip."""
+    return pa.table({name: pa.array(values) for name, values in columns.items()})
+
+def _to_csv(columns: Mapping[str, Sequence[Any]]) -> bytes:
+    # Encode while writing rather than building a str and copying it to bytes;
+    # only the rows are serialized, after the precomputed header.
+    buf = io.BytesIO(_CSV_HEADER_BYTES)
+    buf.seek(0, io.SEEK_END)
+    text = io.TextIOWrapper(buf, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerows(zip(*columns.values()))
+    text.flush()
+    return buf.getvalue()
 
 def _norm_row(source: str, rule: str, typ: str, msg: str,
               line: Optional[int], col: Optional[int], file: Optional[str],
-              sev: Optional[str] = None) -> Dict:
-    return {
-        "Source": source, "Rule": rule or "", "Type": typ or "", "Message": msg or "",
-        "Line": line or "", "Column": col or "", "File": file or "", "Severity/Level": sev or "",
-    }
+              sev: Optional[str] = None) -> Finding:
+    return Finding(source, rule or "", typ or "", msg or "",
+                   line or None, col or None, file or "", sev or "")
+
+# Checker results depend only on the source text (Streamlit skips hashing
+# parameters named with a leading underscore), so identical input is served from
+# cache. The TTL lets upgraded tool versions take effect eventually.
+_cached = st.cache_data(show_spinner=False, max_entries=64, ttl=3600)
 
 # ==================== Safe quick fixes (syntax-only) ====================
+# Block-header prefixes, fused into one multiline pattern so the whole source is
+# fixed in a single re.sub pass. Horizontal whitespace only: a match never spans lines.
 _BLOCK_HEADERS = (
-    r"^\\s*(def\\s+\\w+\\s*\\(.*\\)\\s*)",
-    r"^\\s*(class\\s+\\w+\\s*)",
-    r"^\\s*(if\\s+.*)",
-    r"^\\s*(elif\\s+.*)",
-    r"^\\s*(else\\s*)",
-    r"^\\s*(for\\s+.*)",
-    r"^\\s*(while\\s+.*)",
-    r"^\\s*(try\\s*)",
-    r"^\\s*(except(\\s+.*)?\\s*)",
-    r"^\\s*(finally\\s*)",
-    r"^\\s*(with\\s+.*)",
+    r"def[ \t]+\w+[ \t]*\([^\r\n]*\)",
+    r"class[ \t]+\w+",
+    r"if[ \t]",
+    r"elif[ \t]",
+    r"else\b",
+    r"for[ \t]",
+    r"while[ \t]",
+    r"try\b",
+    r"except\b",
+    r"finally\b",
+    r"with[ \t]",
 )
+_BLOCK_HEADER_RE = re.compile(r"^[ \t]*(?:" + "|".join(_BLOCK_HEADERS) + r")[^\r\n]*", re.MULTILINE)
 
 def _needs_colon(line: str) -> bool:
     stripped = line.strip()
@@ -139,35 +291,58 @@ def _needs_colon(line: str) -> bool:
     return not no_comment.endswith(":")
 
 def apply_quick_fixes(original: str) -> Tuple[str, List[int]]:
-    lines = original.splitlines()
     edited: List[int] = []
-    header_regexes = [re.compile(p) for p in _BLOCK_HEADERS]
-    for idx, line in enumerate(lines):
-        for rx in header_regexes:
-            if rx.match(line):
-                if _needs_colon(line):
-                    lines[idx] = line.rstrip() + ":  # [AUTO-FIXED]"
-                    edited.append(idx + 1)
-                break
-    fixed = "\\n".join(lines)
-    if original.endswith("\\n") and not fixed.endswith("\\n"):
-        fixed += "\\n"
-    return fixed, edited
+    pos, line_no = 0, 1
+
+    def fix(m: "re.Match[str]") -> str:
+        nonlocal pos, line_no
+        line_no += original.count("\n", pos, m.start())
+        pos = m.start()
+        line = m.group(0)
+        if not _needs_colon(line):
+            return line
+        edited.append(line_no)
+        return line.rstrip() + ":  # [AUTO-FIXED]"
+
+    return _BLOCK_HEADER_RE.sub(fix, original), edited
 
 # ==================== Syntax detectors ====================
-def check_ast_syntax(code_text: str) -> List[Dict]:
-    rows: List[Dict] = []
+@functools.lru_cache(maxsize=4)
+def _parse_cache(code_text: str) -> Tuple[Union[ast.Module, SyntaxError], bool]:
+    """Parse and compile the source once; shared by the AST check and smoke test."""
+    tree: Union[ast.Module, SyntaxError]
     try:
-        ast.parse(code_text)
+        tree = ast.parse(code_text)
     except SyntaxError as e:
-        rows.append(_norm_row("AST", "SyntaxError", "SyntaxError", f"{e.msg}",
+        tree = e
+    compiles = False
+    if isinstance(tree, ast.Module):
+        try:
+            compile(tree, "<input>", "exec")
+            compiles = True
+        except SyntaxError:
+            pass
+    return tree, compiles
+
+def _can_compile(code_text: str) -> bool:
+    return _parse_cache(code_text)[1]
+
+@_cached
+def check_ast_syntax(code_text: str) -> List[Finding]:
+    rows: List[Finding] = []
+    e = _parse_cache(code_text)[0]
+    if isinstance(e, SyntaxError):
+        rows.append(_norm_row("AST", type(e).__name__, "SyntaxError", f"{e.msg}",
                               getattr(e, "lineno", None), getattr(e, "offset", None), "<input>"))
     return rows
 
-def check_tokenize(code_text: str) -> List[Dict]:
-    rows: List[Dict] = []
+@_cached
+def check_tokenize(code_text: str) -> List[Finding]:
+    # Fallback only: parso's error-recovering parser reports the same problems.
+    rows: List[Finding] = []
     try:
-        _ = list(tokenize.generate_tokens(io.StringIO(code_text).readline))
+        for _ in tokenize.generate_tokens(io.StringIO(code_text).readline):
+            pass
     except (IndentationError, TabError) as e:
         msg = getattr(e, "msg", str(e)) or "Indentation error"
         ln, col = getattr(e, "lineno", None), getattr(e, "offset", None)
@@ -176,295 +351,499 @@ def check_tokenize(code_text: str) -> List[Dict]:
         rows.append(_norm_row("tokenize", "TokenError", "SyntaxError", str(e), None, None, "<input>"))
     return rows
 
-def check_parso(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    try:
-        import parso  # type: ignore
-    except Exception:
+# Module scope re-executes on every Streamlit rerun; cache_resource keeps the loaded
+# grammar for the life of the process.
+@st.cache_resource(show_spinner=False)
+def _parso_grammar() -> Optional[Any]:  # a parso Grammar; its methods are unannotated
+    """Load parso's grammar once per process; None when parso is not installed."""
+    parso = _optional_import("parso")
+    return parso.load_grammar() if parso is not None else None
+
+@_cached
+def check_parso(code_text: str) -> Tuple[List[Finding], Optional[str]]:
+    grammar = _parso_grammar()
+    if grammar is None:
         return [], "parso not installed"
-    rows: List[Dict] = []
+    rows: List[Finding] = []
     try:
-        grammar = parso.load_grammar()
         module = grammar.parse(code_text, error_recovery=True)
-        for err in module.iter_errors():
-            msg = getattr(err, "message", "Syntax issue")
-            ln, col = getattr(err, "start_pos", (None, None))
-            rows.append(_norm_row("parso", "SyntaxError", "SyntaxError", msg, ln, col, "<input>"))
+        for err in grammar.iter_errors(module):
+            # Messages read "SyntaxError: ..." / "IndentationError: ...".
+            rule, _, msg = err.message.partition(": ")
+            if not msg:
+                rule, msg = "SyntaxError", err.message
+            ln, col = err.start_pos
+            rows.append(_norm_row("parso", rule, "SyntaxError", msg, ln, col + 1, "<input>"))
     except Exception as e:
         rows.append(_norm_row("parso", "", "Internal", f"parso failed: {e}", None, None, "<input>"))
     return rows, None
 
+def check_syntax_combined(code_text: str) -> Tuple[Dict[str, List[Finding]], Optional[str]]:
+    """Single parso pass; ast reports only what parso missed, tokenize only without parso."""
+    if _parso_grammar() is None:
+        fallback = {"AST": check_ast_syntax(code_text), "tokenize": check_tokenize(code_text)}
+        return fallback, "parso not installed"
+    rows, note = check_parso(code_text)
+    results: Dict[str, List[Finding]] = {"parso": rows}
+    # ast is the authority on what CPython accepts (parso misses e.g. TabError), but
+    # once parso has found errors it would only repeat the first one. Its parse is
+    # shared with the compile gate in select_tools, so it is never redone here.
+    if not rows:
+        results["AST"] = check_ast_syntax(code_text)
+    return results, note
+
 # ==================== External tools ====================
-def run_ruff(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    tmp = _tmp_py(code_text)
-    try:
-        rc, out, err = _run(["ruff", "check", "--output-format=json", tmp])
-        if rc == 127:
+# analyze() writes the source to this file name; mypy may report a stale directory
+# for it from its incremental cache, so parsers match on the name only.
+_INPUT_FILE = "input.py"
+_PATH_PREFIX = r"^(?:.*[\\/])?" + re.escape(_INPUT_FILE)
+_MYPY_RE = re.compile(_PATH_PREFIX + r":(\d+):(\d+):[ \t]*(\w+):[ \t]*(.*?)(?:[ \t]*\[([\w-]+)\])?[ \t]*$",
+                      re.MULTILINE)
+# pydocstyle reports each finding on two lines: the location, then "Dxxx: message".
+_PYDOCSTYLE_RE = re.compile(_PATH_PREFIX + r":(\d+)\s.*\n\s+(D\d+):\s*(.*)$", re.MULTILINE)
+# Vulture has no machine-readable format: "input.py:3: unused import 'os' (90% confidence)".
+_VULTURE_RE = re.compile(_PATH_PREFIX + r":(\d+):[ \t]*(.*?)[ \t]*\((\d+)% confidence[^)]*\)[ \t]*$",
+                         re.MULTILINE)
+
+# Rule families Ruff checks in one pass, covering isort (I), pydocstyle (D),
+# Pylint (PL) and Bandit (S) on top of the default lint rules.
+_RUFF_SELECT = "E,F,W,I,D,PL,S,B"
+_RUFF_TYPES = (
+    ("PL", "Code Smell"),
+    ("I", "Import Order"),
+    ("D", "Docstring"),
+    ("S", "Security"),
+)
+
+# One anchored alternation classifies a rule code in a single match.
+_RUFF_TYPE_RE = re.compile("|".join(f"(?P<g{i}>{re.escape(prefix)})"
+                                    for i, (prefix, _) in enumerate(_RUFF_TYPES)))
+
+def _ruff_type(rule: str) -> str:
+    m = _RUFF_TYPE_RE.match(rule)
+    if m is None:
+        return "Lint/Style"
+    assert m.lastgroup is not None  # every alternative is a named group
+    return _RUFF_TYPES[int(m.lastgroup[1:])][1]
+
+@_cached
+def run_ruff(code_text: str, _tmp_path: str) -> Tuple[List[Finding], Optional[str]]:
+    if not _has("ruff"):
+        return [], "Ruff not installed"
+    # Source goes over stdin, so Ruff never touches the scratch file.
+    rc, out, err = _run(["ruff", "check", "--isolated", f"--select={_RUFF_SELECT}",
+                         "--output-format=json", f"--stdin-filename={_INPUT_FILE}", "-"],
+                        stdin=code_text, stderr=False)
+    _check_rc("Ruff", rc)
+    if not out.strip():
+        return [], None
+    rows: List[Finding] = []
+    payload = _json_loads(out)
+    for item in payload:
+        loc = item.get("location", {})
+        rule = item.get("code") or ""
+        rows.append(_norm_row("Ruff", rule, _ruff_type(rule),
+                              item.get("message", ""), loc.get("row"), loc.get("column"),
+                              item.get("filename", "<input>")))
+    return rows, None
+
+@_cached
+def run_ruff_format(code_text: str, _tmp_path: str) -> Tuple[List[Finding], Optional[str]]:
+    # Black-compatible formatting check from Ruff, in-process when ruff_api (Ruff's
+    # formatter bindings; they have no lint entry point) is available.
+    ruff_api = _optional_import("ruff_api")
+    if ruff_api is not None:
+        try:
+            changed = ruff_api.format_string(_INPUT_FILE, code_text) != code_text
+        except Exception:
+            return [], "Ruff format could not parse input"
+    else:
+        if not _has("ruff"):
             return [], "Ruff not installed"
-        if not out.strip():
-            return [], None
-        rows: List[Dict] = []
-        payload = json.loads(out)
-        for item in payload:
-            loc = item.get("location", {})
-            rows.append(_norm_row("Ruff", item.get("code", ""), "Lint/Style",
-                                  item.get("message", ""), loc.get("row"), loc.get("column"),
-                                  item.get("filename", "<input>")))
-        return rows, None
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
-
-def run_black_check(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    tmp = _tmp_py(code_text)
-    try:
-        rc, out, err = _run(["black", "--check", "--diff", tmp])
-        if rc == 127:
-            return [], "Black not installed"
-        rows: List[Dict] = []
-        if rc != 0:
-            rows.append(_norm_row("Black", "format", "Formatting", "File would be reformatted",
-                                  None, None, "<input>"))
-        return rows, None
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
-
-def run_isort_check(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    tmp = _tmp_py(code_text)
-    try:
-        rc, out, err = _run(["isort", "--check-only", "--diff", tmp])
-        if rc == 127:
-            return [], "isort not installed"
-        rows: List[Dict] = []
-        if rc != 0:
-            rows.append(_norm_row("isort", "imports", "Import Order", "Imports not correctly sorted",
-                                  None, None, "<input>"))
-        return rows, None
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
-
-def run_mypy(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    tmp = _tmp_py(code_text)
-    try:
-        rc, out, err = _run(["mypy", "--hide-error-context", "--no-pretty",
-                             "--show-column-numbers", "--no-error-summary", "--strict", tmp])
-        if rc == 127:
-            return [], "mypy not installed"
-        rows: List[Dict] = []
-        for line in (out + "\\n" + err).splitlines():
-            if tmp in line:
-                try:
-                    _, rest = line.split(f"{tmp}:", 1)
-                    parts = rest.split(":", 3)
-                    if len(parts) >= 3:
-                        ln = int(parts[0])
-                        col = int(parts[1])
-                        rest2 = parts[2].strip()
-                        msg = parts[3].strip() if len(parts) == 4 else rest2
-                        code_tag = ""
-                        if "[" in msg and "]" in msg:
-                            code_tag = msg[msg.rfind("[")+1: msg.rfind("]")]
-                        rows.append(_norm_row("mypy", code_tag or "mypy", "TypeError/Typing", msg, ln, col, "<input>"))
-                except Exception:
-                    continue
-        return rows, None
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
-
-def run_bandit(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    tmp = _tmp_py(code_text)
-    try:
-        rc, out, err = _run(["bandit", "-f", "json", "-q", tmp])
-        if rc == 127:
+        rc, out, err = _run(["ruff", "format", "--isolated", "--check",
+                             f"--stdin-filename={_INPUT_FILE}", "-"], stdin=code_text, stderr=False)
+        _check_rc("Ruff format", rc)
+        if rc == 2:
+            return [], "Ruff format could not parse input"
+        changed = rc == 1
+    rows: List[Finding] = []
+    if changed:
+        rows.append(_norm_row("Ruff format", "format", "Formatting", "File would be reformatted",
+                              None, None, "<input>"))
+    return rows, None
+
+_MYPY_FLAGS = ["--hide-error-context", "--no-pretty", "--show-column-numbers",
+               "--no-error-summary", "--strict",
+               f"--cache-dir={os.path.join(_TMP_ROOT or tempfile.gettempdir(), 'revu-mypy-cache')}"]
+
+@st.cache_resource(show_spinner=False)
+def _mypy_daemon() -> Optional[str]:
+    """Start one warm dmypy daemon per process; return its status file, or None if unavailable."""
+    if not _has("dmypy"):
+        return None
+    status_dir = tempfile.mkdtemp(prefix="revu-dmypy-", dir=_TMP_ROOT)
+    status_file = os.path.join(status_dir, "status.json")
+    # atexit runs handlers last-in first-out: stop the daemon, then remove its directory.
+    atexit.register(shutil.rmtree, status_dir, True)
+    rc, out, err = _run(["dmypy", "--status-file", status_file, "start", "--", *_MYPY_FLAGS],
+                        timeout=60)
+    if rc != 0:
+        return None
+    atexit.register(_run, ["dmypy", "--status-file", status_file, "stop"])
+    return status_file
+
+def _mypy_rows(out: bytes, err: bytes) -> List[Finding]:
+    # One scan over the whole report instead of a match per split line.
+    rows: List[Finding] = []
+    for m in _MYPY_RE.finditer(b"\n".join((out, err)).decode(errors="ignore")):
+        ln, col, sev, msg, code_tag = m.groups()
+        rows.append(_norm_row("mypy", code_tag or "mypy", "TypeError/Typing", msg,
+                              int(ln), int(col), "<input>", sev))
+    return rows
+
+@_cached
+def run_mypy(code_text: str, _tmp_path: str) -> Tuple[List[Finding], Optional[str]]:
+    if not _has("mypy"):
+        return [], "mypy not installed"
+    # mypy and dmypy exit 2 both for blocking errors in the input (syntax errors,
+    # reported like any other finding) and for their own failures (which report
+    # nothing about the input), so a 2 only counts as an answer with findings.
+    status_file = _mypy_daemon()
+    rc = -1
+    rows: List[Finding] = []
+    if status_file:
+        rc, out, err = _run(["dmypy", "--status-file", status_file, "check", _tmp_path], timeout=60)
+        rows = _mypy_rows(out, err)
+        if rc not in (0, 1) and not rows:
+            # The daemon is gone or wedged: drop it so the next review starts a
+            # fresh one, and answer this one with a cold run.
+            _run(["dmypy", "--status-file", status_file, "kill"])
+            _mypy_daemon.clear()
+    if rc not in (0, 1) and not rows:
+        rc, out, err = _run(["mypy", *_MYPY_FLAGS, _tmp_path])
+        _check_rc("mypy", rc)
+        rows = _mypy_rows(out, err)
+        if rc == 2 and not rows:
+            raise RuntimeError("exited with status 2")
+    return rows, None
+
+@_cached
+def run_bandit(code_text: str, _tmp_path: str) -> Tuple[List[Finding], Optional[str]]:
+    rows: List[Finding] = []
+    issues: List[Dict[str, Any]] = []  # Bandit's own issue dicts
+    # Bandit exposes a library API; use it in-process when importable.
+    bandit_manager = _optional_import("bandit.core.manager")
+    if bandit_manager is not None:
+        try:
+            # Already loaded by bandit.core.manager, so this is a sys.modules lookup.
+            bandit_config = importlib.import_module("bandit.core.config")
+            mgr = bandit_manager.BanditManager(bandit_config.BanditConfig(), "file", quiet=True)
+            mgr.discover_files([_tmp_path])
+            mgr.run_tests()
+            issues = [issue.as_dict() for issue in mgr.get_issue_list()]
+        except Exception:
+            return rows, "Bandit could not analyse input"
+    else:
+        if not _has("bandit"):
             return [], "Bandit not installed"
-        rows: List[Dict] = []
+        rc, out, err = _run(["bandit", "-f", "json", "-q", _tmp_path], stderr=False)
+        _check_rc("Bandit", rc)
         if out.strip():
             try:
-                data = json.loads(out)
-                for issue in data.get("results", []):
-                    rows.append(_norm_row("Bandit", issue.get("test_id", ""), "Security",
-                                          issue.get("issue_text", ""),
-                                          issue.get("line_number"), None, issue.get("filename"),
-                                          issue.get("issue_severity")))
+                issues = _json_loads(out).get("results", [])
             except Exception:
                 pass
-        return rows, None
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
+    for issue in issues:
+        rows.append(_norm_row("Bandit", issue.get("test_id", ""), "Security",
+                              issue.get("issue_text", ""),
+                              issue.get("line_number"), None, issue.get("filename"),
+                              issue.get("issue_severity")))
+    return rows, None
 
-def run_pydocstyle(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    tmp = _tmp_py(code_text)
-    try:
-        rc, out, err = _run(["pydocstyle", tmp])
-        if rc == 127:
-            return [], "pydocstyle not installed"
-        rows: List[Dict] = []
-        for line in out.splitlines():
-            if ":" in line and tmp in line:
-                try:
-                    _, rest = line.split(f"{tmp}:", 1)
-                    ln = int(rest.split()[0])
-                    code_tag = rest.split()[-1].split(":")[0] if ":" in rest else "Dxxx"
-                    rows.append(_norm_row("pydocstyle", code_tag, "Docstring", line.strip(), ln, None, "<input>"))
-                except Exception:
-                    continue
-        return rows, None
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
-
-def run_pylint(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    tmp = _tmp_py(code_text)
-    try:
-        rc, out, err = _run(["pylint", "--output-format=json", "--score=n", tmp], timeout=60)
-        if rc == 127:
-            return [], "pylint not installed"
-        rows: List[Dict] = []
-        if out.strip():
-            try:
-                data = json.loads(out)
-                for item in data:
-                    rows.append(_norm_row("Pylint", item.get("symbol", ""), "Code Smell",
-                                          item.get("message", ""),
-                                          item.get("line"), item.get("column"), item.get("path"),
-                                          item.get("type")))
-            except Exception:
-                pass
-        return rows, None
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
+@_cached
+def run_pydocstyle(code_text: str, _tmp_path: str) -> Tuple[List[Finding], Optional[str]]:
+    if not _has("pydocstyle"):
+        return [], "pydocstyle not installed"
+    rc, out, err = _run(["pydocstyle", _tmp_path], stderr=False)
+    _check_rc("pydocstyle", rc)
+    rows: List[Finding] = []
+    for m in _PYDOCSTYLE_RE.finditer(out.decode(errors="ignore")):
+        ln, code_tag, msg = m.groups()
+        rows.append(_norm_row("pydocstyle", code_tag, "Docstring", msg.strip(), int(ln), None, "<input>"))
+    return rows, None
 
-def run_radon_complexity(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    tmp = _tmp_py(code_text)
-    try:
-        rc, out, err = _run(["radon", "cc", "-j", tmp])
-        if rc == 127:
-            return [], "radon not installed"
-        rows: List[Dict] = []
-        if out.strip():
-            try:
-                data = json.loads(out)
-                for fn, blocks in data.items():
-                    for b in blocks:
-                        rows.append(_norm_row("Radon", f"CC {b.get('rank')}", "Complexity",
-                                              f"{b.get('name')} has complexity {b.get('complexity')}",
-                                              b.get("lineno"), None, fn))
-            except Exception:
-                pass
-        return rows, None
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
+@_cached
+def run_pylint(code_text: str, _tmp_path: str) -> Tuple[List[Finding], Optional[str]]:
+    if not _has("pylint"):
+        return [], "pylint not installed"
+    rc, out, err = _run(["pylint", "--output-format=json", "--score=n", _tmp_path], timeout=60,
+                        stderr=False)
+    _check_rc("Pylint", rc)
+    rows: List[Finding] = []
+    if out.strip():
+        try:
+            data = _json_loads(out)
+            for item in data:
+                rows.append(_norm_row("Pylint", item.get("symbol", ""), "Code Smell",
+                                      item.get("message", ""),
+                                      item.get("line"), item.get("column"), item.get("path"),
+                                      item.get("type")))
+        except Exception:
+            pass
+    return rows, None
 
-def run_vulture(code_text: str) -> Tuple[List[Dict], Optional[str]]:
-    tmp = _tmp_py(code_text)
-    try:
-        rc, out, err = _run(["vulture", tmp, "--min-confidence", "0", "--json"])
-        if rc == 127:
-            return [], "vulture not installed"
-        rows: List[Dict] = []
-        if out.strip():
-            try:
-                data = json.loads(out)
-                for item in data:
-                    rows.append(_norm_row("Vulture", item.get("type", ""), "Dead Code",
-                                          item.get("message", ""),
-                                          item.get("line"), None, item.get("filename"),
-                                          f"conf={item.get('confidence')}"))
-            except Exception:
-                pass
-        return rows, None
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
+@_cached
+def run_radon_complexity(code_text: str, _tmp_path: str) -> Tuple[List[Finding], Optional[str]]:
+    if not _has("radon"):
+        return [], "radon not installed"
+    rc, out, err = _run(["radon", "cc", "-j", _tmp_path], stderr=False)
+    _check_rc("Radon", rc)
+    rows: List[Finding] = []
+    if out.strip():
+        try:
+            data = _json_loads(out)
+            for fn, blocks in data.items():
+                for b in blocks:
+                    rows.append(_norm_row("Radon", f"CC {b.get('rank')}", "Complexity",
+                                          f"{b.get('name')} has complexity {b.get('complexity')}",
+                                          b.get("lineno"), None, fn))
+        except Exception:
+            pass
+    return rows, None
+
+@_cached
+def run_vulture(code_text: str, _tmp_path: str) -> Tuple[List[Finding], Optional[str]]:
+    if not _has("vulture"):
+        return [], "vulture not installed"
+    rc, out, err = _run(["vulture", _tmp_path, "--min-confidence", "0"], stderr=False)
+    _check_rc("Vulture", rc)
+    if rc == 1:
+        return [], "Vulture could not parse input"
+    rows: List[Finding] = []
+    for m in _VULTURE_RE.finditer(out.decode(errors="ignore")):
+        ln, msg, conf = m.groups()
+        # The rule is the kind of finding: "unused import", "unreachable code", ...
+        rule = " ".join(msg.replace("'", "").split()[:2])
+        rows.append(_norm_row("Vulture", rule, "Dead Code", msg, int(ln), None, "<input>",
+                              f"conf={conf}%"))
+    return rows, None
 
 # ==================== Runtime smoke (optional) ====================
-def run_smoke_test(code_text: str, maybe_fix: bool, treat_warnings_as_errors: bool) -> Tuple[List[Dict], Optional[str], Optional[str], Optional[str]]:
-    rows: List[Dict] = []
+@_cached
+def quick_fix_diff(original: str, fixed: str, edited: List[int]) -> str:
+    # Built only when the diff is rendered, and memoized across reruns. Quick fixes
+    # only append to existing lines, so line numbers never shift: emit one hunk per
+    # edited line instead of running difflib's full-file matcher. Lines are split on
+    # "\n" only, as apply_quick_fixes counts them (splitlines() also breaks on
+    # form feeds, \r and other separators, which would shift the numbering).
+    old, new = original.split("\n"), fixed.split("\n")
+    out = ["--- original\n", "+++ fixed\n"]
+    for ln in edited:
+        out.append(f"@@ -{ln} +{ln} @@\n-{old[ln - 1]}\n+{new[ln - 1]}\n")
+    return "".join(out)
+
+@_cached
+def run_smoke_test(code_text: str, maybe_fix: bool, treat_warnings_as_errors: bool, enabled: bool,
+                   _scratch_dir: str) -> Tuple[List[Finding], Optional[str], Optional[str], List[int]]:
+    rows: List[Finding] = []
     note: Optional[str] = None
     used_code = code_text
-    diff_text: Optional[str] = None
-
-    def _can_compile(src: str) -> bool:
-        try:
-            compile(src, "<input>", "exec")
-            return True
-        except SyntaxError:
-            return False
+    edited: List[int] = []
 
-    if not run_smoke:
-        return rows, "Runtime test disabled", None, None
+    if not enabled:
+        return rows, "Runtime test disabled", None, []
 
     if _can_compile(used_code):
         pass
     elif maybe_fix:
         fixed, edited = apply_quick_fixes(used_code)
         if edited and _can_compile(fixed):
-            diff = difflib.unified_diff(used_code.splitlines(True), fixed.splitlines(True),
-                                        fromfile="original", tofile="fixed")
-            diff_text = "".join(diff)
             used_code = fixed
             note = f"Applied safe quick fixes on lines: {edited}"
         else:
-            return rows, "Skipped runtime (does not compile, even after quick fixes)", None, None
+            return rows, "Skipped runtime (does not compile, even after quick fixes)", None, []
     else:
-        return rows, "Skipped runtime (does not compile; enable quick fixes to attempt)", None, None
-
-    tmp = _tmp_py(used_code)
-    try:
-        cmd = ["python"]
-        if treat_warnings_as_errors:
-            cmd += ["-W", "error"]
-        cmd += ["-I", "-X", "faulthandler", tmp]
-        rc, out, err = _run(cmd, timeout=3)
-        if rc != 0:
-            msg = (err or out).strip()
-            first = msg.splitlines()[0] if msg else "Runtime error"
-            rows.append(_norm_row("Runtime", "", "Runtime", first, None, None, "<input>"))
-        return rows, note, used_code, diff_text
-    finally:
-        try: os.remove(tmp)
-        except OSError: pass
+        return rows, "Skipped runtime (does not compile; enable quick fixes to attempt)", None, []
+
+    cmd = ["python"]
+    if treat_warnings_as_errors:
+        cmd += ["-W", "error"]
+    cmd += ["-I", "-X", "faulthandler"]
+    if "__file__" in used_code:
+        # A script read from stdin has no __file__; give it a real one. Its own name
+        # in the session directory: analyze() may be writing input.py concurrently.
+        rc, out, err = _run(cmd + [_write(os.path.join(_scratch_dir, "smoke.py"), used_code)],
+                            timeout=3)
+    else:
+        rc, out, err = _run(cmd + ["-"], timeout=3, stdin=used_code)
+    if rc != 0:
+        msg = (err or out).decode(errors="replace").strip()
+        first = msg.splitlines()[0] if msg else "Runtime error"
+        rows.append(_norm_row("Runtime", "", "Runtime", first, None, None, "<input>"))
+    return rows, note, used_code, edited
 
 # ==================== Orchestrate checks ====================
-def analyze(code_text: str) -> Dict[str, List[Dict]]:
-    parso_rows, parso_note = check_parso(code_text)
-    if parso_note:
-        st.caption(f"parso: {parso_note}")
-    results: Dict[str, List[Dict]] = {
-        "AST": check_ast_syntax(code_text),
-        "tokenize": check_tokenize(code_text),
-        "parso": parso_rows,
-        "Ruff": run_ruff(code_text)[0],
-        "Black": run_black_check(code_text)[0],
-        "isort": run_isort_check(code_text)[0],
-        "mypy": run_mypy(code_text)[0],
-        "Bandit": run_bandit(code_text)[0],
-        "pydocstyle": run_pydocstyle(code_text)[0],
-        "Pylint": run_pylint(code_text)[0],
-        "Radon": run_radon_complexity(code_text)[0],
-        "Vulture": run_vulture(code_text)[0],
-    }
-    return results
+EXTERNAL_TOOLS = {
+    "Ruff": run_ruff,
+    "Ruff format": run_ruff_format,
+    "mypy": run_mypy,
+    "Bandit": run_bandit,
+    "pydocstyle": run_pydocstyle,
+    "Pylint": run_pylint,
+    "Radon": run_radon_complexity,
+    "Vulture": run_vulture,
+}
+_TOOL_BINARIES = {
+    "Ruff": "ruff",
+    "Ruff format": "ruff",
+    "mypy": "mypy",
+    "Bandit": "bandit",
+    "pydocstyle": "pydocstyle",
+    "Pylint": "pylint",
+    "Radon": "radon",
+    "Vulture": "vulture",
+}
+# Tools run through a library API, by the module they import.
+_IN_PROCESS = {"Ruff format": "ruff_api", "Bandit": "bandit"}
+# Tools that take the source as a string (stdin or library call) and never read input.py.
+_STDIN_TOOLS = {"Ruff", "Ruff format"}
+
+def _in_process(name: str) -> Optional[ModuleType]:
+    module = _IN_PROCESS.get(name)
+    return _optional_import(module) if module else None
+
+@st.cache_resource(show_spinner=False)
+def _tool_available(name: str) -> bool:
+    # Probed once per process: a missing tool is never spawned just to hit ENOENT.
+    return _in_process(name) is not None or _has(_TOOL_BINARIES[name])
+
+# Tools whose checks Ruff already runs (via _RUFF_SELECT or ruff format); opt-in only.
+LEGACY_TOOLS = {"Bandit", "pydocstyle", "Pylint"}
+# Slow to start and rarely informative on short snippets; skipped below HEAVY_MIN_LINES.
+HEAVY_TOOLS = {"Pylint", "Radon", "Vulture"}
+HEAVY_MIN_LINES = 50
+# The only tool with error recovery; the rest need source that compiles and would
+# just repeat the syntax error the AST/parso checks already report.
+ERROR_TOLERANT_TOOLS = {"Ruff"}
+
+@st.cache_resource(show_spinner=False)
+def _tool_version(name: str) -> str:
+    mod = _in_process(name)
+    if mod is not None:
+        return str(getattr(mod, "__version__", "?"))
+    rc, out, err = _run([_TOOL_BINARIES[name], "--version"], timeout=15)
+    text = (out or err).decode(errors="replace").strip()
+    return text.splitlines()[0] if text else "?"
+
+# Bumped whenever the shape of cached results changes, so old entries are never read.
+_CACHE_FORMAT = "findings-v4"
+# Entries expire so a result can never outlive the conditions it was produced under.
+_DISK_CACHE_TTL = 7 * 24 * 3600
+
+@st.cache_resource(show_spinner=False)
+def _disk_cache() -> Optional["diskcache.Cache"]:
+    if diskcache is None:
+        return None
+    return diskcache.Cache(os.environ.get("REVU_CACHE_DIR", ".revu_cache"))
+
+@st.cache_resource(show_spinner=False)
+def _disk_cache_stats() -> "Counter[str]":
+    """Disk cache hit/miss counters for this process, shown in the sidebar after a run."""
+    return Counter()
+
+def select_tools(code_text: str, include_legacy: bool = False,
+                 always_heavy: bool = False) -> List[str]:
+    skip_heavy = not always_heavy and len(code_text.splitlines()) < HEAVY_MIN_LINES
+    compiles = _can_compile(code_text)
+    return [name for name in EXTERNAL_TOOLS
+            if (include_legacy or name not in LEGACY_TOOLS)
+            and not (skip_heavy and name in HEAVY_TOOLS)
+            and (compiles or name in ERROR_TOLERANT_TOOLS)]
+
+# Not memoized as a whole: each tool is, and only clean results are persisted, so a
+# tool that failed on this input is retried on the next review instead of replayed.
+def analyze(code_text: str, include_legacy: bool = False,
+            always_heavy: bool = False) -> Tuple[Dict[str, List[Finding]], List[str]]:
+    """Run the syntax checks and selected tools; return findings per tool and notes to show."""
+    selected = select_tools(code_text, include_legacy, always_heavy)
+    notes: List[str] = []
+    # Only submit tools that are actually installed; the rest report no findings.
+    available = [name for name in selected if _tool_available(name)]
+    # Results persist on disk keyed by (source hash, tool, tool version), so a
+    # resubmitted snippet skips the subprocesses entirely.
+    cache = _disk_cache()
+    digest = hashlib.blake2b(code_text.encode("utf-8")).hexdigest()
+    keys: Dict[str, str] = {}
+    cached: Dict[str, Tuple[List[Finding], Optional[str]]] = {}
+    if cache is not None:
+        keys = {name: f"{_CACHE_FORMAT}:{digest}:{name}:{_tool_version(name)}" for name in available}
+        for name, key in keys.items():
+            try:
+                hit = cache.get(key)
+            except Exception:  # unreadable entry (e.g. pickled by an older build): a miss
+                hit = None
+            if hit is not None:
+                cached[name] = hit
+    stats = _disk_cache_stats()
+    stats["hits"] += len(cached)
+    stats["misses"] += len(keys) - len(cached)
+    pending = [name for name in available if name not in cached]
+    futures: Dict[str, "concurrent.futures.Future[Tuple[List[Finding], Optional[str]]]"] = {}
+    results: Dict[str, List[Finding]] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(pending))) as ex:
+        # External tools are independent subprocesses: write the source once (only if
+        # some tool reads files) and let them all read the same file concurrently.
+        if pending:
+            tmp_path = ""
+            if any(name not in _STDIN_TOOLS for name in pending):
+                tmp_path = _write(os.path.join(_session_dir(), _INPUT_FILE), code_text)
+            futures = {name: ex.submit(EXTERNAL_TOOLS[name], code_text, tmp_path)
+                       for name in pending}
+        # The in-process syntax checks run on this thread while the tools work.
+        syntax_results, parso_note = check_syntax_combined(code_text)
+        results.update(syntax_results)
+        if parso_note:
+            notes.insert(0, f"parso: {parso_note}")
+    for name in selected:
+        fut = futures.get(name)
+        note: Optional[str] = None
+        if name in cached:
+            results[name], note = cached[name]
+        elif fut is None:
+            results[name] = []
+        elif fut.exception() is not None:
+            results[name] = [_norm_row(name, "", "Internal", f"{name} failed: {fut.exception()}",
+                                       None, None, "<input>")]
+        else:
+            results[name], note = fut.result()
+            # Only clean runs are stored: a note means the tool could not analyse the
+            # input, and timeouts or missing binaries raise and never get here.
+            if cache is not None and name in keys and note is None:
+                # The cache is best-effort: a full disk or an unpicklable result must
+                # not cost the user the findings that were just computed.
+                try:
+                    cache.set(keys[name], fut.result(), expire=_DISK_CACHE_TTL)
+                except Exception:
+                    pass
+        if note:
+            notes.append(f"{name}: {note}")
+    return results, notes
 
-def flatten(all_results: Dict[str, List[Dict]]) -> List[Dict]:
-    rows: List[Dict] = []
-    for v in all_results.values():
-        rows.extend(v)
-    return rows
+def flatten(all_results: Dict[str, List[Finding]]) -> Dict[str, Tuple[Any, ...]]:
+    return _columns(itertools.chain.from_iterable(all_results.values()))
 
-def summarize(all_rows: List[Dict]) -> Dict[str, int]:
-    counts: Dict[str, int] = {}
-    for r in all_rows:
-        src = r.get("Source", "Unknown")
-        counts[src] = counts.get(src, 0) + 1
-    return counts
+def filter_source(combined: Dict[str, Tuple[Any, ...]], source: str) -> Dict[str, Tuple[Any, ...]]:
+    keep = [i for i, s in enumerate(combined["Source"]) if s == source]
+    return {h: tuple(col[i] for i in keep) for h, col in combined.items()}
+
+def summarize(combined: Dict[str, Tuple[Any, ...]]) -> Dict[str, int]:
+    # Busiest tools first.
+    return dict(Counter(source or "Unknown" for source in combined["Source"]).most_common())
 
 # ==================== Run review ====================
+# One scan for a Python keyword at a word start ("classifier " is not "class ").
+_PY_HINT_RE = re.compile(r"(?:^|\s)(?:import|def|class) ")
+
 if run_clicked:
     if not code or not code.strip():
         st.warning("Please paste code or upload a file first.")
@@ -474,7 +853,7 @@ if run_clicked:
     if lang == "Auto":
         if uploaded and uploaded.name.endswith(".py"):
             lang = "Python"
-        elif any(tok in code for tok in ["import ", "def ", "class "]):
+        elif _PY_HINT_RE.search(code):
             lang = "Python"
         else:
             lang = "JavaScript / Other"
@@ -483,23 +862,65 @@ if run_clicked:
         st.warning("This checker focuses on Python.")
         st.stop()
 
+    if not _can_compile(code):
+        st.warning("Parse failed: skipping type, security and formatting tools; fix the syntax "
+                   "errors first. Ruff and the syntax checks still run.")
+    planned = select_tools(code, run_legacy_tools, always_heavy_tools)
+    missing = [name for name in planned if not _tool_available(name)]
     st.info(
-        "Running: AST, tokenize, parso*, Ruff, Black, isort, mypy, Bandit, pydocstyle, Pylint, Radon, Vulture"
+        "Running: AST, " + ("parso, " if _parso_grammar() is not None else "tokenize, ")
+        + ", ".join(name for name in planned if name not in missing)
         + (", Runtime smoke" if run_smoke else "")
         + " …"
+        + (f" (not installed: {', '.join(missing)})" if missing else "")
     )
 
-    all_results = analyze(code)
-    runtime_rows, runtime_note, used_code, diff_text = run_smoke_test(
-        code, apply_fixes_before_runtime, warnings_as_errors
-    )
+    # The smoke test is its own subprocess; run it alongside the analyzers
+    # rather than after them. The page above is already painted; the spinner
+    # shows while the script waits on the tools.
+    with st.spinner("Reviewing…"), \
+            concurrent.futures.ThreadPoolExecutor(max_workers=1) as smoke_ex:
+        smoke = smoke_ex.submit(run_smoke_test, code, apply_fixes_before_runtime, warnings_as_errors,
+                                run_smoke, _session_dir())
+        all_results, notes = analyze(code, include_legacy=run_legacy_tools,
+                                     always_heavy=always_heavy_tools)
+        runtime_rows, runtime_note, used_code, fixed_lines = smoke.result()
+    for note in notes:
+        st.caption(note)
     all_results["Runtime"] = runtime_rows
+    if _disk_cache() is not None:
+        stats = _disk_cache_stats()
+        st.sidebar.caption(f"Tool cache: {stats['hits']} hits / {stats['misses']} misses")
+
+    # Kept in session state so the source filter below can rerun the script
+    # without re-running the review.
+    st.session_state["review"] = {
+        "code": code,
+        "combined": flatten(all_results),
+        "runtime_note": runtime_note,
+        "used_code": used_code,
+        "fixed_lines": fixed_lines,
+    }
 
-    combined = flatten(all_results)
+# A fragment: the source filter and download buttons rerun only this block, not
+# the whole script (uploads, sidebar, run block) above it.
+@st.fragment
+def _render_review(review: Dict[str, Any]) -> None:
+    combined = review["combined"]
 
     st.subheader("All Findings (Unified)")
-    if combined:
-        st.dataframe(combined, use_container_width=True)
+    if combined["Source"]:
+        # One virtualized grid filtered by source instead of a static HTML table per tool.
+        source = st.selectbox("Filter by source", ["All", *dict.fromkeys(combined["Source"])],
+                              key="source_filter")
+        shown = combined if source == "All" else filter_source(combined, source)
+        st.dataframe(_to_arrow(shown), use_container_width=True, hide_index=True)
+        st.download_button(
+            label=f"⬇️ Download {source} findings (CSV)",
+            data=_to_csv(shown),
+            file_name="all_findings.csv" if source == "All" else f"{source.lower()}_findings.csv",
+            mime="text/csv",
+        )
     else:
         st.success("✅ No issues reported by the enabled tools.")
 
@@ -508,35 +929,14 @@ if run_clicked:
         counts = summarize(combined)
         st.json(counts)
 
-    # Per-tool breakdown + CSV
-    for tool, rows in all_results.items():
-        st.markdown(f"### {tool} findings")
-        if rows:
-            st.table(rows)
-            st.download_button(
-                label=f"⬇️ Download {tool} findings (CSV)",
-                data=_to_csv(rows, ["Source", "Rule", "Type", "Message", "Line", "Column", "File", "Severity/Level"]),
-                file_name=f"{tool.lower()}_findings.csv",
-                mime="text/csv",
-            )
-        else:
-            st.caption(f"No {tool} findings or tool not installed / not applicable.")
-
-    st.download_button(
-        label="⬇️ Download All Findings (CSV)",
-        data=_to_csv(combined, ["Source", "Rule", "Type", "Message", "Line", "Column", "File", "Severity/Level"]),
-        file_name="all_findings.csv",
-        mime="text/csv",
-    )
-
     # Runtime notes + optional diff & fixed code download
     st.markdown("### Runtime test")
-    if runtime_note:
-        st.info(runtime_note)
-    if diff_text:
+    if review["runtime_note"]:
+        st.info(review["runtime_note"])
+    used_code = review["used_code"]
+    if used_code and review["fixed_lines"]:
         with st.expander("Show quick-fix diff (unified)"):
-            st.code(diff_text, language="diff")
-    if used_code and diff_text:
+            st.code(quick_fix_diff(review["code"], used_code, review["fixed_lines"]), language="diff")
         st.download_button(
             "⬇️ Download quick-fixed code",
             used_code.encode("utf-8"),
@@ -544,18 +944,28 @@ if run_clicked:
             mime="text/x-python",
         )
 
+# A stored review is shown only while it matches the current input; after an edit
+# or a new upload it would describe code that is no longer on screen.
+review = st.session_state.get("review")
+if review and review["code"] == code:
+    _render_review(review)
+elif review:
+    st.caption("The code changed since the last review; click Review Code to refresh the findings.")
+
 # ==================== References ====================
-st.markdown("## References")
-st.markdown("- Python built-in exceptions: https://docs.python.org/3/library/exceptions.html")
-st.markdown("- Python tokenize module: https://docs.python.org/3/library/tokenize.html")
-st.markdown("- Parso tolerant parser: https://parso.readthedocs.io/en/latest/")
-st.markdown("- Ruff (lint/format/imports): https://docs.astral.sh/ruff/")
-st.markdown("- Black (formatter): https://black.readthedocs.io/en/stable/")
-st.markdown("- isort (import sorting): https://pycqa.github.io/isort/")
-st.markdown("- mypy (static typing): https://mypy.readthedocs.io/en/stable/")
-st.markdown("- Bandit (security): https://bandit.readthedocs.io/en/latest/")
-st.markdown("- pydocstyle (docstrings): https://www.pydocstyle.org/en/stable/")
-st.markdown("- Pylint: https://pylint.readthedocs.io/")
-st.markdown("- Radon (complexity): https://radon.readthedocs.io/")
-st.markdown("- Vulture (dead code): https://vulture.readthedocs.io/")
-st.markdown("- Streamlit st.image: https://docs.streamlit.io/library/api-reference/media/st.image")
\ No newline at end of file
+# One markdown element for the whole section rather than one per line.
+_REFERENCES_MD = "\n".join([
+    "## References",
+    "- Python built-in exceptions: https://docs.python.org/3/library/exceptions.html",
+    "- Python tokenize module: https://docs.python.org/3/library/tokenize.html",
+    "- Parso tolerant parser: https://parso.readthedocs.io/en/latest/",
+    "- Ruff (lint/format/imports): https://docs.astral.sh/ruff/",
+    "- mypy (static typing): https://mypy.readthedocs.io/en/stable/",
+    "- Bandit (security): https://bandit.readthedocs.io/en/latest/",
+    "- pydocstyle (docstrings): https://www.pydocstyle.org/en/stable/",
+    "- Pylint: https://pylint.readthedocs.io/",
+    "- Radon (complexity): https://radon.readthedocs.io/",
+    "- Vulture (dead code): https://vulture.readthedocs.io/",
+    "- Streamlit st.image: https://docs.streamlit.io/library/api-reference/media/st.image",
+])
+st.markdown(_REFERENCES_MD)
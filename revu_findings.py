@@ -0,0 +1,32 @@
+"""Finding record shared by RevU's checkers.
+
+Kept out of the Streamlit script: each rerun re-executes the script as a fresh
+``__main__``, so a class defined there cannot be pickled by st.cache_data or
+diskcache once the module has been swapped.
+"""
+
+from typing import List, NamedTuple, Optional
+
+FINDING_HEADERS: List[str] = [
+    "Source",
+    "Rule",
+    "Type",
+    "Message",
+    "Line",
+    "Column",
+    "File",
+    "Severity/Level",
+]
+
+
+class Finding(NamedTuple):
+    """One normalized finding; field order matches FINDING_HEADERS."""
+
+    source: str
+    rule: str
+    typ: str
+    msg: str
+    line: Optional[int]
+    col: Optional[int]
+    file: str
+    sev: str